@@ -1,14 +1,20 @@
-import random
 import math
+import os
+import random
+import subprocess
+import sys
 import time
 import unittest
 
 from treaccp.nodes import (
     H,
     to_key,
+    to_keys,
     join_proofs,
+    find,
     find_path,
     is_treap,
+    CompressedNode,
     ErrKeyNotInTree,
     ErrKeyInTree,
     ErrInvalidProof,
@@ -20,7 +26,9 @@ from treaccp.tree import build_treaccp
 
 # Deterministic random for reproducibility
 seed_rng = str(random.random())
-RNG_SEED = int(H("Blockchains synchronize global communication." + seed_rng), 16)
+RNG_SEED = int.from_bytes(
+    H("Blockchains synchronize global communication." + seed_rng), "big"
+)
 random.seed(RNG_SEED)
 print(f"Seed: {RNG_SEED}\n")
 
@@ -65,6 +73,17 @@ class TestTreaccp(unittest.TestCase):
         except AssertionError as exc:
             assert exc.args[0] == "not a heap"
 
+    def test_bytes_elements(self):
+        # Bytes elements are hashed raw by H; the batch key derivation must agree with the
+        # single-element one or lookups built through one path miss keys built by the other
+        els = [b"a", b"b", b"c"]
+        self.assertEqual(to_keys(els), [to_key(el) for el in els])
+
+        treap = build_treaccp(els)
+        self.assertIsNotNone(treap.find(b"a"))
+        treap, _ = treap.insert_many([b"d"], prove=False)
+        self.assertIsNotNone(treap.find(b"d"))
+
     def test_irrelevant_order(self):
         els = list(range(1000))
 
@@ -108,6 +127,53 @@ class TestTreaccp(unittest.TestCase):
         with self.assertRaises(ErrKeyNotInTree):
             removed_treap.prove_inclusion(el_in_set)
 
+    def test_tampered_proof_rejected(self):
+        els = range(100)
+        treap = build_treaccp(els)
+        acc = treap.to_acc()
+
+        proof = treap.prove_inclusion(7)
+        self.assertTrue(acc.verify_inclusion(7, proof))
+
+        # A malicious prover rewrites the key of the proven node to an element outside the
+        # set. Verification must rehash the proof from its fields instead of trusting the
+        # roots cached at construction, so the recomputation no longer matches.
+        find(proof, to_key(7)).key = to_key(5000)
+        with self.assertRaises(AssertionError):
+            proof.compute_merkle_root()
+
+        # The accumulator entry points reject the tampered proof for the same reason
+        with self.assertRaises(ErrMerkleRootMismatch):
+            acc.insert_many([5000], proof)
+
+    def test_forged_compressed_node_rejected(self):
+        els = range(100)
+        treap = build_treaccp(els)
+        acc = treap.to_acc()
+
+        proof = treap.prove_inclusion(7)
+        self.assertTrue(acc.verify_inclusion(7, proof))
+
+        # Forge a compressed node that inherits an honest sibling's merkle root but claims a
+        # different key. Verification recomputes compressed roots from their fields, so the
+        # inherited root must not be believed.
+        honest = proof.left if isinstance(proof.left, CompressedNode) else proof.right
+        forged = CompressedNode(
+            to_key(5000),
+            honest.left_hash,
+            honest.right_hash,
+            merkle_root=honest.merkle_root,
+        )
+        if proof.left is honest:
+            proof.left = forged
+        else:
+            proof.right = forged
+
+        with self.assertRaises(AssertionError):
+            proof.compute_merkle_root()
+        with self.assertRaises(ErrMerkleRootMismatch):
+            acc.insert_many([5000], proof)
+
     def test_exclusion_proof(self):
         treap = self.treap_10k
         el_in_set = next(iter(self.treap_10k_els))  # takes one element from the set
@@ -151,6 +217,18 @@ class TestTreaccp(unittest.TestCase):
         treap.verify_inclusion(12, joined)
         treap.verify_inclusion(4, joined)
 
+    def test_join_proofs_rejects_tampered_member(self):
+        els = [5, 10, 2, 7, 12, 4, 8, 9]
+        treap = build_treaccp(els)
+
+        proofs = [treap.prove_inclusion(12), treap.prove_inclusion(2)]
+
+        # Every node in the member proofs carries a cached root, but the post-join check must
+        # still rehash the joined tree from its fields and catch the rewritten key
+        find(proofs[0], to_key(12)).key = to_key(3)
+        with self.assertRaises(AssertionError):
+            join_proofs(proofs)
+
     def test_inclusion_exclusion(self):
         els = list(range(10000))
         random.shuffle(els)
@@ -444,6 +522,35 @@ class TestTreaccp(unittest.TestCase):
         assert acc2.merkle_root == treap.merkle_root
         assert acc2.merkle_root == acc1.merkle_root
 
+    def test_warp_rejects_tampered_state(self):
+        els = range(100)
+        treap = build_treaccp(els)
+        acc = treap.to_acc()
+
+        insert_els = [104, 201]
+        remove_els = [15, 8]
+        proofs = [treap.insert_proof(el) for el in insert_els]
+        proofs += [treap.remove_proof(el) for el in remove_els]
+        joined_proof = join_proofs(proofs)
+
+        acc2 = treap.to_acc()
+        acc2, t1 = acc2.insert_many(insert_els, joined_proof)
+        acc2, t2 = acc2.remove_many(remove_els, t1)
+
+        # Corrupt the stored root of the claimed new state. The key sets still match the
+        # expected update, so only a from-scratch recomputation can catch it — warp must not
+        # trust the roots cached on the proof's nodes.
+        honest_root = t2.merkle_root
+        t2.merkle_root = H(b"forged")
+        with self.assertRaises(AssertionError):
+            acc.warp(joined_proof, set(insert_els), set(remove_els), t2)
+        t2.merkle_root = honest_root
+
+        # Rewriting a proven key is caught as well
+        find(t2, to_key(104)).key = to_key(9999)
+        with self.assertRaises(AssertionError):
+            acc.warp(joined_proof, set(insert_els), set(remove_els), t2)
+
     def test_warp_state_large(self):
         treap = self.treap_10k
         acc1 = self.treap_10k.to_acc()
@@ -477,5 +584,58 @@ class TestTreaccp(unittest.TestCase):
         print(f"acc warp insert/remove time: {time.time() - start}")
 
 
+class TestConfigFlags(unittest.TestCase):
+    """The env flags are read at import time, so each case runs in a fresh interpreter."""
+
+    def _run(self, code, **env_overrides):
+        env = dict(os.environ)
+        env.update(env_overrides)
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            env=env,
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout.strip()
+
+    def test_hash_backend_sha256(self):
+        out = self._run(
+            "import hashlib\n"
+            "from treaccp.nodes import H\n"
+            "print(H(b'x') == hashlib.sha256(b'x').digest())",
+            TREACCP_HASH="sha256",
+        )
+        self.assertEqual(out, "True")
+
+    def test_hash_backend_blake3_or_fallback(self):
+        # With blake3 installed the flag must select it; without it the selector must fall
+        # back to the default hash instead of failing at import
+        out = self._run(
+            "import hashlib\n"
+            "try:\n"
+            "    from blake3 import blake3\n"
+            "    expected = blake3(b'x').digest()\n"
+            "except ImportError:\n"
+            "    expected = hashlib.blake2b(b'x', digest_size=32).digest()\n"
+            "from treaccp.nodes import H\n"
+            "print(H(b'x') == expected)",
+            TREACCP_HASH="blake3",
+        )
+        self.assertEqual(out, "True")
+
+    def test_verify_proofs_flag(self):
+        out = self._run(
+            "from treaccp import nodes\n"
+            "print(nodes._VERIFY_PROOFS)\n"
+            "root = nodes.build_treap([1, 2, 3])\n"
+            "proof = root.prove_inclusion(nodes.to_key(2))\n"
+            "print(proof.merkle_root == root.merkle_root)",
+            TREACCP_VERIFY_PROOFS="0",
+        )
+        self.assertEqual(out.splitlines(), ["False", "True"])
+
+
 if __name__ == "__main__":
     unittest.main()
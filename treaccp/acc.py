@@ -1,6 +1,22 @@
 """Implementations of an accumulator for our Treaccp structure."""
 
-from treaccp.nodes import insert, remove, to_key, is_treap, ErrMerkleRootMismatch
+from treaccp.nodes import (
+    insert_many_bulk,
+    remove_many_bulk,
+    to_keys,
+    collect_keys_partitioned,
+    recompute_merkle_root,
+    verify_treap_and_root,
+    ErrMerkleRootMismatch,
+)
+
+
+def _xor_keys(keys):
+    """XOR-sum of a set of 32 byte keys. Serves as an order-independent fingerprint of the set."""
+    res = 0
+    for key in keys:
+        res ^= int.from_bytes(key, "big")
+    return res
 
 
 class Acc:
@@ -19,9 +35,9 @@ class Acc:
         # merkle root and catch any incorrect values.
         if self.merkle_root != proof.merkle_root:
             raise ErrMerkleRootMismatch(
-                f"Expected: {self.merkle_root}, got: {proof.merkle_root}"
+                f"Expected: {self.merkle_root.hex()}, got: {proof.merkle_root.hex()}"
             )
-        keys = [to_key(el) for el in els]
+        keys = to_keys(els)
         return proof.verify_inclusions(keys, proof)
 
     def verify_exclusion(self, el, proof):
@@ -34,9 +50,9 @@ class Acc:
         # merkle root and catch any incorrect values.
         if self.merkle_root != proof.merkle_root:
             raise ErrMerkleRootMismatch(
-                f"Expected: {self.merkle_root}, got: {proof.merkle_root}"
+                f"Expected: {self.merkle_root.hex()}, got: {proof.merkle_root.hex()}"
             )
-        keys = [to_key(el) for el in els]
+        keys = to_keys(els)
         return proof.verify_exclusions(keys, proof)
 
     def insert(self, el, proof):
@@ -48,17 +64,15 @@ class Acc:
     def insert_many(self, els, proof):
         """Inserts many elements in the accumulator with a single merkle root verification."""
 
-        # Verify the compressed tree is the same as the tree we have
-        proof_root = proof.compute_merkle_root()
+        # Verify the compressed tree is the same as the tree we have. The proof is foreign,
+        # so it's rehashed from its fields rather than trusting any cached roots it carries.
+        proof_root = recompute_merkle_root(proof)
         if self.merkle_root != proof_root:
             raise ErrMerkleRootMismatch(
-                f"Expected: {self.merkle_root}, got: {proof_root}"
+                f"Expected: {self.merkle_root.hex()}, got: {proof_root.hex()}"
             )
 
-        compressed_tree = proof
-        for el in els:
-            key = to_key(el)
-            compressed_tree = insert(compressed_tree, key)
+        compressed_tree = insert_many_bulk(proof, sorted(to_keys(els)))
 
         return Acc(compressed_tree), compressed_tree
 
@@ -70,17 +84,15 @@ class Acc:
     def remove_many(self, els, proof):
         """Removes many elements from the accumulator with a single merkle root verification."""
 
-        # Verify the compressed tree is the same as the tree we have
-        proof_root = proof.compute_merkle_root()
+        # Verify the compressed tree is the same as the tree we have. The proof is foreign,
+        # so it's rehashed from its fields rather than trusting any cached roots it carries.
+        proof_root = recompute_merkle_root(proof)
         if self.merkle_root != proof_root:
             raise ErrMerkleRootMismatch(
-                f"Expected: {self.merkle_root}, got: {proof_root}"
+                f"Expected: {self.merkle_root.hex()}, got: {proof_root.hex()}"
             )
 
-        compressed_tree = proof
-        for el in els:
-            key = to_key(el)
-            compressed_tree = remove(compressed_tree, key)
+        compressed_tree = remove_many_bulk(proof, sorted(to_keys(els)))
 
         return Acc(compressed_tree), compressed_tree
 
@@ -104,42 +116,47 @@ class Acc:
         inside the space of correct proof. But there is only one valid treap inside this space
         so if the result is a valid treap, it has to be the correct one.
         """
-        # we should have two sets with empty intersection
-        assert isinstance(added, set) and isinstance(removed, set)
-        assert added.intersection(removed) == set()
-
-        # Verify the compressed tree is the same as the tree we have
-        proof_root = proof.compute_merkle_root()
+        # added/removed can be any iterables of elements; they're hashed into key sets once and
+        # the two sets must not overlap. The keys must land on regular "N" nodes, never on a
+        # compressed node.
+        added_keys = frozenset(to_keys(added))
+        removed_keys = frozenset(to_keys(removed))
+        assert not added_keys & removed_keys
+
+        # Verify the compressed tree is the same as the tree we have. The proof is foreign,
+        # so it's rehashed from its fields rather than trusting any cached roots it carries.
+        proof_root = recompute_merkle_root(proof)
         if self.merkle_root != proof_root:
             raise ErrMerkleRootMismatch(
-                f"Expected: {self.merkle_root}, got: {proof_root}"
+                f"Expected: {self.merkle_root.hex()}, got: {proof_root.hex()}"
             )
 
-        # compute old keys and new keys and collect their node types and merkle roots. We must ensure the compressed
-        # nodes didn't change their merkle root or the attacker could change their children.
-        ext_old_keys = proof.collect_keys(extended=True)
-        old_keys = set((key, _type) for key, _type, _ in ext_old_keys)
-        old_C_keys = set((key, _type, merkle_root) for (key, _type, merkle_root) in ext_old_keys if _type == "C")
-        old_N_keys = set((key, _type) for (key, _type, _) in ext_old_keys if _type == "N")
+        # compute old keys and new keys partitioned by node type, along with the compressed node merkle roots.
+        # We must ensure the compressed nodes didn't change their merkle root or the attacker could change
+        # their children.
+        # Compressed entries are packed `key || merkle_root` byte strings; the key is the first
+        # 32 bytes.
+        old_N_keys, old_C_keys = collect_keys_partitioned(proof)
+        new_N_keys, new_C_keys = collect_keys_partitioned(new_proof)
 
-        ext_new_keys = new_proof.collect_keys(extended=True)
-        new_keys = set((key, _type) for (key, _type, _) in ext_new_keys)
-        new_C_keys = set((key, _type, merkle_root) for (key, _type, merkle_root) in ext_new_keys if _type == "C")
-        new_N_keys = set((key, _type) for (key, _type, _) in ext_new_keys if _type == "N")
+        # Cheap prechecks that reject most invalid warps before any derived set is built: the
+        # node count and the XOR-sum of the keys must already match the expected update.
+        assert len(new_N_keys) - len(old_N_keys) == len(added_keys) - len(removed_keys)
+        expected_xor = _xor_keys(old_N_keys) ^ _xor_keys(added_keys) ^ _xor_keys(removed_keys)
+        assert _xor_keys(new_N_keys) == expected_xor
 
-        # The added and removed keys must have type node type "N" meaning they're not a compressed node
-        added_keys = set([(to_key(el), "N") for el in added])
-        removed_keys = set([(to_key(el), "N") for el in removed])
+        old_keys = old_N_keys | {e[:32] for e in old_C_keys}
+        new_keys = new_N_keys | {e[:32] for e in new_C_keys}
 
         # Verify warp
         assert removed_keys.intersection(old_N_keys) == removed_keys  # removed keys exist in old_N_keys
         assert added_keys.intersection(old_keys) == set()             # added keys don't exist in old_keys
         assert new_N_keys - old_N_keys == added_keys                  # the only new N type keys are added ones
         assert (old_keys | added_keys) - removed_keys == new_keys     # check the keys are what we expect
-        assert is_treap(new_proof)                                    # the new state must be a valid treap
         assert old_C_keys == new_C_keys                               # same compressed nodes including merkle roots
 
-        # Verify merkle root of new_proof by recomputing everything.
-        new_proof.compute_merkle_root()
+        # The new state must be a valid treap and its merkle root has to be recomputed from
+        # scratch; one fused traversal verifies both.
+        verify_treap_and_root(new_proof)
 
         return Acc(new_proof), new_proof
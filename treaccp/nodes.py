@@ -1,4 +1,4 @@
-"""Implementation of merkle treap nodes whose keys and priorities are pseudorandom 32 byte integers.
+"""Implementation of merkle treap nodes whose keys and priorities are pseudorandom 32 byte values.
 Treap is able to prove inclusion of a key by showing a proof that takes a form of a compressed subtree
 which allows us to perform an action like 'find' to prove a key is or isn't in the tree. One way to
 visualize the tree is to think of each node as a random (2^256, 2^256) point in a 2D space and we can
@@ -6,25 +6,103 @@ prove a point is or isn't in our space. Because all the data a node holds is pse
 really hold information about the elements themselves, just a hash commitment to them.
 """
 
+import concurrent.futures
 import hashlib
+import os
+import weakref
+from bisect import bisect_left
+from functools import lru_cache, partial
+
+def _select_hasher():
+    """Picks the hash backend once at import so H carries no per-call dispatch overhead.
+
+    The default is blake2b truncated to 32 bytes: it ships with hashlib, is C-implemented and
+    considerably faster than sha256 in software for the short messages hashed here. Users bound
+    to a specific hash by an external protocol can set TREACCP_HASH=sha256 (hashlib's one-shot
+    API, which uses the fastest backend OpenSSL was built with, e.g. SHA-NI assembly) or
+    TREACCP_HASH=blake3 (the `blake3` package, SIMD implementation). An unavailable backend
+    falls back to the default. Only the internal hash changes with the flag; digests keep the
+    same width.
+    """
+    backend = os.environ.get("TREACCP_HASH", "blake2b")
+    if backend == "sha256":
+        return hashlib.sha256
+    if backend == "blake3":
+        try:
+            from blake3 import blake3
+
+            return blake3
+        except ImportError:
+            pass
+    return partial(hashlib.blake2b, digest_size=32)
+
+
+_new_hasher = _select_hasher()
+
+# Constructing a fresh hash context re-runs backend init, which is a sizeable fraction of the
+# cost of hashing the ~100 byte messages used here. Hashing through a copy of one prepared
+# empty context skips that init on every call.
+_HASH_PROTO = _new_hasher()
 
 
 def H(_input):
-    """Hash function used to generate pseudorandom data."""
-    _input = str(_input)
-    return hashlib.sha256(_input.encode("utf-8")).hexdigest()
+    """Hash function used to generate pseudorandom data. Returns a raw 32 byte digest."""
+    if not isinstance(_input, bytes):
+        _input = str(_input).encode("utf-8")
+    h = _HASH_PROTO.copy()
+    h.update(_input)
+    return h.digest()
 
 
 # We treat empty leaves as a hash to avoid any possible tampering
-HASH_NONE = H("None")
+HASH_NONE = H(b"None")
 
 
+# The same element is hashed over and over across proof construction (insert_proof,
+# remove_proof, warp), so the element -> key mapping is memoized. Elements are hashable
+# ints/strings by assumption.
+@lru_cache(maxsize=1 << 16)
 def to_key(el):
-    return int(H(el), 16)
+    """Maps an element to its 32 byte key. Keys are kept as raw bytes: comparisons are C-level
+    memcmp (lexicographic order over bytes equals big-endian numeric order) and hash inputs are
+    built with plain concatenation."""
+    return H(el)
+
+
+def to_keys(els):
+    """Computes keys for a batch of elements in one tight loop.
+
+    Equivalent to [to_key(el) for el in els] but with the hasher and conversion hoisted out of
+    the loop, which matters when accumulator operations hash thousands of elements at once.
+    """
+    proto_copy = _HASH_PROTO.copy
+    keys = []
+    for el in els:
+        h = proto_copy()
+        # Same input normalization as H, so the batch path derives the same key as to_key
+        h.update(el if isinstance(el, bytes) else str(el).encode("utf-8"))
+        keys.append(h.digest())
+    return keys
+
+
+# Every node rebuilt by split/merge/compress re-derives the priority of the same key, so the
+# mapping is memoized. Long-running processes can free the entries via to_priority.cache_clear().
+@lru_cache(maxsize=1 << 20)
+def to_priority(key):
+    """Maps a 32 byte key to its 32 byte priority."""
+    return H(key)
 
 
-def to_priority(key):
-    return int(H(str(key)), 16)
+# Proof construction ends with a recomputation of the just-built proof's merkle root as a
+# sanity check on our own code. Operators who trust the build can turn these checks off
+# globally with TREACCP_VERIFY_PROOFS=0; verifications of foreign proofs are unaffected.
+_VERIFY_PROOFS = os.environ.get("TREACCP_VERIFY_PROOFS", "1") != "0"
+
+
+def _adjacent_key(key, delta):
+    """Returns the key shifted by delta as 32 bytes. Keys are pseudorandom, so shifting by a
+    small delta never wraps around in practice."""
+    return (int.from_bytes(key, "big") + delta).to_bytes(32, "big")
 
 
 class ErrKeyNotInTree(Exception):
@@ -52,19 +130,46 @@ class ErrTouchedCompressedNode(Exception):
 class CompressedNode:
     """A compressed node is a node that holds only merkle roots of its children."""
 
-    def __init__(self, key, left_hash, right_hash):
+    # Proofs hold one CompressedNode per off-path sibling, so the per-instance __dict__
+    # overhead adds up quickly
+    __slots__ = (
+        "key",
+        "prior",
+        "left_hash",
+        "right_hash",
+        "merkle_root",
+        "_hash_prefix",
+        "_cached_root",
+        "__weakref__",  # needed for the weak interning cache below
+    )
+
+    # The passed merkle_root is a prover-side optimization only: verification of foreign trees
+    # rehashes compressed nodes from their fields (see recompute_merkle_root), so a value that
+    # doesn't match the key and child hashes is caught there rather than trusted here.
+    def __init__(
+        self,
+        key,
+        left_hash,
+        right_hash,
+        merkle_root=None,  # can be passed as an optimization when the caller already knows it
+    ):
         self.key = key
         self.prior = to_priority(self.key)
         self.left_hash = left_hash
         self.right_hash = right_hash
-        self.merkle_root = self.compute_merkle_root()
+        # The hash input prefix never changes, so it's packed once up front as raw bytes
+        self._hash_prefix = self.key + self.prior
+        self.merkle_root = (
+            self.compute_merkle_root() if merkle_root is None else merkle_root
+        )
+        # The root is derived purely from the fields above which never change after construction
+        self._cached_root = self.merkle_root
 
     def compute_merkle_root(self):
-        node_hash = str(self.key) + str(self.prior)
-        hash_input = [node_hash, self.left_hash, self.right_hash]
-        merkle_root = H("".join(hash_input))
+        h = _HASH_PROTO.copy()
+        h.update(self._hash_prefix + self.left_hash + self.right_hash)
 
-        return merkle_root
+        return h.digest()
 
     def collect_keys(self, extended=False):
         """Compressed treap only knows about its own key."""
@@ -74,9 +179,63 @@ class CompressedNode:
         return set([self.key])
 
 
+# Interning cache for compressed nodes, keyed on their merkle root
+_COMPRESSED_CACHE = weakref.WeakValueDictionary()
+
+# Doubled empty-leaf hash for the leaf combiner below, concatenated once at import
+_HASH_NONE_PAIR = HASH_NONE + HASH_NONE
+
+
+def _root_of_leaf(node):
+    h = _HASH_PROTO.copy()
+    h.update(node._hash_prefix + _HASH_NONE_PAIR)
+    return h.digest()
+
+
+def _root_of_left(node):
+    h = _HASH_PROTO.copy()
+    h.update(node._hash_prefix + node.left.merkle_root + HASH_NONE)
+    return h.digest()
+
+
+def _root_of_right(node):
+    h = _HASH_PROTO.copy()
+    h.update(node._hash_prefix + HASH_NONE + node.right.merkle_root)
+    return h.digest()
+
+
+def _root_of_inner(node):
+    h = _HASH_PROTO.copy()
+    h.update(node._hash_prefix + node.left.merkle_root + node.right.merkle_root)
+    return h.digest()
+
+
+# One root combiner per node shape, keyed on (left is None, right is None). A node's shape is
+# fixed at construction, so binding the matching combiner once removes the two child branches
+# from every subsequent root computation.
+_ROOT_FNS = {
+    (True, True): _root_of_leaf,
+    (False, True): _root_of_left,
+    (True, False): _root_of_right,
+    (False, False): _root_of_inner,
+}
+
+
 class Node:
     """A treap where keys and priorities are expected to be pseudorandom."""
 
+    # Trees hold one Node per element, so the per-instance __dict__ overhead adds up quickly
+    __slots__ = (
+        "key",
+        "prior",
+        "left",
+        "right",
+        "merkle_root",
+        "_hash_prefix",
+        "_cached_root",
+        "_root_fn",
+    )
+
     def __init__(
         self,
         key,
@@ -89,15 +248,42 @@ class Node:
         self.prior = to_priority(self.key) if prior is None else prior
         self.left = left
         self.right = right
+        # The hash input prefix never changes, so it's packed once up front as raw bytes
+        self._hash_prefix = self.key + self.prior
+        self._root_fn = _ROOT_FNS[left is None, right is None]
+        self._cached_root = None
         self.merkle_root = self.compute_merkle_root(
             recurse=recursive_merkle, verify=False
         )
+        # A root derived from fully hashed children is itself fully hashed. Paths rebuilt by
+        # split/merge over clean subtrees are therefore born clean, so later prover-side
+        # hashing passes only descend into subtrees that were never hashed. The cache is a
+        # prover-side shortcut only: verification of foreign trees ignores it and rehashes
+        # everything (see recompute_merkle_root).
+        if self._cached_root is None and (
+            (left is None or left._cached_root is not None)
+            and (right is None or right._cached_root is not None)
+        ):
+            self._cached_root = self.merkle_root
 
     def compress(self):
-        """Returns the compressed representation of the node."""
+        """Returns the compressed representation of the node.
+
+        Compressed nodes are interned: the merkle root commits to the key and both child
+        hashes, so two compressions with the same root are interchangeable. Proofs built over
+        the same tree (and their joins) therefore share sibling objects instead of allocating
+        fresh copies. The cache holds weak references only, so it never keeps proofs alive.
+        """
+        node = _COMPRESSED_CACHE.get(self.merkle_root)
+        if node is not None:
+            return node
         left_hash = self.left.merkle_root if self.left else HASH_NONE
         right_hash = self.right.merkle_root if self.right else HASH_NONE
-        return CompressedNode(self.key, left_hash, right_hash)
+        # A compressed node hashes the exact same input as the node itself, so the already
+        # computed root is passed along instead of being rehashed
+        node = CompressedNode(self.key, left_hash, right_hash, self.merkle_root)
+        _COMPRESSED_CACHE[self.merkle_root] = node
+        return node
 
     def compute_merkle_root(self, recurse=True, verify=True):
         """
@@ -112,30 +298,34 @@ class Node:
 
         Note that by default this traverses the whole tree and computes merkle root for every node.
         We recompute the whole tree merkle roots for proofs we are given to ensure they're correct.
-        """
 
-        def _tree_hash(t, recurse):
-            if t is None:
-                return HASH_NONE
-            if recurse:
-                # we don't need to pass recurse because it's True by default
-                return t.compute_merkle_root()
-            return t.merkle_root
-
-        # We commit to priorities even though they're derived from keys. This way, if we verify the merkle root
-        # for a proof is correct, we know the data in the proof (keys, priorities) could not have been tampered.
-        node_hash = str(self.key) + str(self.prior)
-        hash_input = [
-            node_hash,
-            _tree_hash(self.left, recurse),
-            _tree_hash(self.right, recurse),
-        ]
-        merkle_root = H("".join(hash_input))
+        With verify=True the tree is treated as foreign: every node is rehashed from its fields
+        via `recompute_merkle_root`, ignoring cached roots and precomputed prefixes, because a
+        prover controls those and a verifier that skips "already hashed" subtrees would accept
+        tampered nodes. Without verification (hashing a tree this process built itself) the
+        traversal is delegated to the iterative `compute_merkle_root_batched`, which reuses the
+        roots this process already computed.
+        """
+        if verify:
+            stored_root = self.merkle_root
+
+        if recurse:
+            # We commit to priorities even though they're derived from keys. This way, if we verify
+            # the merkle root for a proof is correct, we know the data in the proof (keys,
+            # priorities) could not have been tampered.
+            if verify:
+                merkle_root = recompute_merkle_root(self)
+            else:
+                merkle_root = compute_merkle_root_batched(self)
+        else:
+            # The shape-specialized combiner bound at construction hashes the children's
+            # stored roots without re-testing which children exist
+            merkle_root = self._root_fn(self)
 
         # We also verify the merkle_root is correct. The only case where this wouldn't be true is if an attacker
         # set the merkle_root to a wrong value in an attempt to fool us.
         if verify:
-            assert self.merkle_root == merkle_root
+            assert stored_root == merkle_root
 
         return merkle_root
 
@@ -154,43 +344,57 @@ class Node:
 
         Since nodes don't contain elements, a subtree can't leak any element. Nodes labeled N are regular nodes.
         Nodes labeled C are compressed nodes meaning they only hold merkle roots of their children.
+
+        The search path is collected with a loop and rebuilt bottom-up so proof construction
+        doesn't pay a Python frame per level or risk the recursion limit on deep paths.
         """
-        if self is None:
-            raise ErrKeyNotInTree(f"{key}")
-        if self.key == key:
-            return Node(
-                key=self.key,
-                prior=self.prior,
-                left=self.left.compress() if self.left else None,
-                right=self.right.compress() if self.right else None,
-            )
+        # Walk down to the key, remembering which way we went at every node on the path
+        path = []
+        node = self
+        while node.key != key:
+            if key > node.key:
+                if not node.right:
+                    raise ErrKeyNotInTree(f"{key.hex()}")
+                path.append((node, True))
+                node = node.right
+            else:
+                if not node.left:
+                    raise ErrKeyNotInTree(f"{key.hex()}")
+                path.append((node, False))
+                node = node.left
+
+        proof = Node(
+            key=node.key,
+            prior=node.prior,
+            left=node.left.compress() if node.left else None,
+            right=node.right.compress() if node.right else None,
+        )
+        # Rebuild the path upwards, compressing every sibling that's off the search path
+        for node, went_right in reversed(path):
+            if went_right:
+                proof = Node(
+                    key=node.key,
+                    prior=node.prior,
+                    left=node.left.compress() if node.left else None,
+                    right=proof,
+                    recursive_merkle=False,  # to avoid expensive recomputation
+                )
+            else:
+                proof = Node(
+                    key=node.key,
+                    prior=node.prior,
+                    left=proof,
+                    right=node.right.compress() if node.right else None,
+                    recursive_merkle=False,  # to avoid expensive recomputation
+                )
 
-        if key > self.key:
-            if not self.right:
-                raise ErrKeyNotInTree(f"{key}")
-            right = self.right._compress_tree_for(key)
-            return Node(
-                key=self.key,
-                prior=self.prior,
-                left=self.left.compress() if self.left else None,
-                right=right,
-                recursive_merkle=False,  # to avoid expensive recomputation
-            )
-        else:
-            if not self.left:
-                raise ErrKeyNotInTree(f"{key}")
-            left = self.left._compress_tree_for(key)
-            return Node(
-                key=self.key,
-                prior=self.prior,
-                left=left,
-                right=self.right.compress() if self.right else None,
-                recursive_merkle=False,  # to avoid expensive recomputation
-            )
+        return proof
 
-    def prove_inclusion(self, key):
+    def prove_inclusion(self, key, verify=None):
         """An inclusion proof is a compressed version of the tree that keeps nodes in the search path intact,
-        but compresses all other nodes.
+        but compresses all other nodes. Passing verify=False skips the sanity recomputation of the
+        proof's merkle root, which a caller batching many proofs over its own tree doesn't need;
+        the default follows the module-wide _VERIFY_PROOFS flag.
 
         Given a tree
                                     Proof for 86          Proof for 80          Proof for 5
@@ -209,7 +413,10 @@ class Node:
         the key 5 **without touching a compressed node** during search.
         """
         proof = self._compress_tree_for(key)
-        assert self.merkle_root == proof.compute_merkle_root()  # sanity check
+        if verify is None:
+            verify = _VERIFY_PROOFS
+        if verify:
+            assert self.merkle_root == proof.compute_merkle_root()  # sanity check
 
         return proof
 
@@ -219,21 +426,21 @@ class Node:
 
     def collect_keys(self, extended=False):
         """Returns a set of keys in the tree, optionally with the node type that holds the key."""
-        cur = None
-        if extended:
-            cur = set([(self.key, "N", self.merkle_root)])
-        else:
-            cur = set([self.key])
-
-        # We collect the keys recursively. Compressed nodes return only their key.
-        left_keys = set()
-        if self.left:
-            left_keys = self.left.collect_keys(extended=extended)
-        right_keys = set()
-        if self.right:
-            right_keys = self.right.collect_keys(extended=extended)
-
-        return left_keys | cur | right_keys
+        keys = set()
+        stack = [self]
+        while stack:
+            t = stack.pop()
+            # Compressed nodes only know about their own key
+            if isinstance(t, CompressedNode):
+                keys.add((t.key, "C", t.merkle_root) if extended else t.key)
+                continue
+            keys.add((t.key, "N", t.merkle_root) if extended else t.key)
+            if t.left:
+                stack.append(t.left)
+            if t.right:
+                stack.append(t.right)
+
+        return keys
 
     def verify_inclusions(self, keys, proof):
         """Verifies that multiple keys are included in the set."""
@@ -241,18 +448,18 @@ class Node:
         proof_root = proof.compute_merkle_root()
         if self.merkle_root != proof_root:
             raise ErrMerkleRootMismatch(
-                f"Expected: {self.merkle_root}, got: {proof_root}"
+                f"Expected: {self.merkle_root.hex()}, got: {proof_root.hex()}"
             )
 
         # Collect the keys and compare
         observed_keys = proof.collect_keys()
         for key in keys:
             if key not in observed_keys:
-                raise ErrInvalidProof(f"{key}")
+                raise ErrInvalidProof(f"{key.hex()}")
 
         return True
 
-    def prove_exclusion(self, key):
+    def prove_exclusion(self, key, verify=None):
         """We prove exclusion by showing an inclusion proof for a position at which the key should be, but is None.
 
         Given a tree
@@ -281,10 +488,10 @@ class Node:
         """
         path = find_path(self, key)
         if path[-1] is not None:
-            raise ErrKeyInTree(f"{key}")
+            raise ErrKeyInTree(f"{key.hex()}")
 
         last_touched_key = path[-2].key
-        proof = self.prove_inclusion(last_touched_key)
+        proof = self.prove_inclusion(last_touched_key, verify=verify)
 
         return proof
 
@@ -299,7 +506,7 @@ class Node:
         proof_root = proof.compute_merkle_root()
         if self.merkle_root != proof_root:
             raise ErrMerkleRootMismatch(
-                f"Expected: {self.merkle_root}, got: {proof_root}"
+                f"Expected: {self.merkle_root.hex()}, got: {proof_root.hex()}"
             )
 
         for key in keys:
@@ -311,7 +518,7 @@ class Node:
             except ErrTouchedCompressedNode:
                 raise ErrInvalidProof
             if node is not None:
-                raise ErrKeyInTree(f"{key}")
+                raise ErrKeyInTree(f"{key.hex()}")
 
         return True
 
@@ -332,12 +539,12 @@ class Node:
         if prove:
             proofs = []
             for key in keys:
-                proofs.append(insert_proof(self, key))
+                # join_proofs verifies the joined tree once, so the per-proof sanity
+                # recomputation is skipped here
+                proofs.append(insert_proof(self, key, verify=False))
             proof = join_proofs(proofs)
 
-        res = self
-        for key in keys:
-            res = insert(res, key)
+        res = insert_many_bulk(self, sorted(keys))
         return res, proof
 
     def remove(self, key, prove=True):
@@ -348,85 +555,447 @@ class Node:
         if prove:
             proofs = []
             for key in keys:
-                proofs.append(remove_proof(self, key))
+                # join_proofs verifies the joined tree once, so the per-proof sanity
+                # recomputation is skipped here
+                proofs.append(remove_proof(self, key, verify=False))
             proof = join_proofs(proofs)
 
-        res = self
-        for key in keys:
-            res = remove(res, key)
+        res = remove_many_bulk(self, sorted(keys))
         return res, proof
 
 
+def collect_keys_partitioned(node):
+    """Collects the keys of a tree in a single pass, partitioned by node type.
+
+    Returns a pair (n_keys, c_keys) where n_keys is a set of keys held by regular nodes and
+    c_keys is a set of packed `key || merkle_root` byte strings for compressed nodes. Unlike
+    `collect_keys(extended=True)` followed by set comprehensions, the tree is walked only once
+    and no intermediate extended key set is built and rescanned. Packing the compressed entries
+    into one bytes object makes set hashing and comparison run over a single flat buffer
+    instead of a tuple of objects. The walk uses an explicit stack like `collect_keys`, so it
+    neither allocates a frame per node nor risks the recursion limit on deep proofs.
+    """
+    n_keys, c_keys = set(), set()
+    stack = [node]
+    while stack:
+        t = stack.pop()
+        if isinstance(t, CompressedNode):
+            c_keys.add(t.key + t.merkle_root)
+            continue
+        n_keys.add(t.key)
+        if t.left:
+            stack.append(t.left)
+        if t.right:
+            stack.append(t.right)
+
+    return n_keys, c_keys
+
+
+def compute_merkle_root_batched(root):
+    """Computes the merkle root of a tree by hashing it level by level instead of recursing.
+
+    This partitions the nodes by depth first and then hashes each level in one tight loop,
+    skipping subtrees whose roots this process already computed. Because it trusts those
+    cached roots, it must only be used on trees this process built itself; verification of
+    foreign trees goes through `recompute_merkle_root`, which trusts nothing.
+    """
+    if root is None:
+        return HASH_NONE
+
+    # Collect the nodes level by level. Compressed nodes have no children to descend into and
+    # subtrees with a cached root were already fully hashed, so neither needs to be revisited.
+    levels = [[root]]
+    while levels[-1]:
+        next_level = []
+        for node in levels[-1]:
+            if isinstance(node, CompressedNode) or node._cached_root is not None:
+                continue
+            if node.left:
+                next_level.append(node.left)
+            if node.right:
+                next_level.append(node.right)
+        levels.append(next_level)
+    levels.pop()
+    _hash_levels(levels)
+
+    return root.merkle_root
+
+
+def _hash_levels(levels):
+    """Hashes level-partitioned nodes bottom-up so children roots always precede their parents."""
+    for level in reversed(levels):
+        for node in level:
+            if isinstance(node, CompressedNode) or node._cached_root is not None:
+                continue
+            # The shape-specialized combiner hashes the children's stored roots without
+            # re-testing which children exist
+            node.merkle_root = node._root_fn(node)
+            node._cached_root = node.merkle_root
+
+
+def recompute_merkle_root(root):
+    """Recomputes the merkle root of a possibly foreign tree purely from node fields.
+
+    Nothing the prover stored is trusted: cached roots are ignored, every node's hash input is
+    rebuilt from its key and priority fields rather than a precomputed prefix, and compressed
+    nodes are rehashed from their child hashes instead of using the root they carry. Nothing is
+    written back to the tree, so a tampered node changes the returned root instead of being
+    skipped over.
+    """
+    if root is None:
+        return HASH_NONE
+
+    levels = [[root]]
+    while levels[-1]:
+        next_level = []
+        for node in levels[-1]:
+            if isinstance(node, CompressedNode):
+                continue
+            if node.left:
+                next_level.append(node.left)
+            if node.right:
+                next_level.append(node.right)
+        levels.append(next_level)
+    levels.pop()
+
+    return _recompute_levels(levels, root)
+
+
+def _recompute_levels(levels, root):
+    """Hashes level-partitioned nodes bottom-up from their fields without touching the tree."""
+    computed = {}
+    proto_copy = _HASH_PROTO.copy
+    for level in reversed(levels):
+        for node in level:
+            h = proto_copy()
+            if isinstance(node, CompressedNode):
+                h.update(node.key + node.prior + node.left_hash + node.right_hash)
+            else:
+                left_hash = computed[id(node.left)] if node.left else HASH_NONE
+                right_hash = computed[id(node.right)] if node.right else HASH_NONE
+                h.update(node.key + node.prior + left_hash + right_hash)
+            computed[id(node)] = h.digest()
+
+    return computed[id(root)]
+
+
+def verify_treap_and_root(root):
+    """Verifies the treap invariants and recomputes the merkle root in one traversal.
+
+    Equivalent to `assert is_treap(root)` followed by a full untrusted recomputation: heap and
+    binary tree invariants are checked on the way down, the merkle roots are rebuilt from node
+    fields on the way back up, and the stored root must match the recomputed one. Returns the
+    merkle root.
+    """
+    levels = [[root]]
+    while levels[-1]:
+        next_level = []
+        for node in levels[-1]:
+            if isinstance(node, CompressedNode):
+                continue
+            if node.left:
+                assert node.prior > node.left.prior, "not a heap"
+                assert node.key > node.left.key, "not a binary tree"
+                next_level.append(node.left)
+            if node.right:
+                assert node.prior > node.right.prior, "not a heap"
+                assert node.key < node.right.key, "not a binary tree"
+                next_level.append(node.right)
+        levels.append(next_level)
+    levels.pop()
+    merkle_root = _recompute_levels(levels, root)
+    assert root.merkle_root == merkle_root
+
+    return merkle_root
+
+
+def compute_merkle_root_parallel(root, max_workers=None):
+    """Computes the merkle root by hashing independent subtrees on a thread pool.
+
+    The top of the tree is peeled off until there are enough independent subtrees to keep the
+    workers busy; each subtree is hashed with `compute_merkle_root_batched` and the peeled nodes
+    are combined serially at the end. This only pays off with a hash backend that releases the
+    GIL (hashlib holds it for the small inputs we hash), which is why the accumulator keeps the
+    serial batched walk as its default.
+    """
+    if root is None:
+        return HASH_NONE
+
+    max_workers = max_workers or os.cpu_count() or 1
+    subtrees = [root]
+    peeled = []
+    while len(subtrees) < max_workers:
+        next_subtrees = []
+        expanded = False
+        for node in subtrees:
+            if node is None or isinstance(node, CompressedNode) or node._cached_root is not None:
+                next_subtrees.append(node)
+                continue
+            peeled.append(node)
+            next_subtrees.append(node.left)
+            next_subtrees.append(node.right)
+            expanded = True
+        if not expanded:
+            break
+        subtrees = next_subtrees
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(compute_merkle_root_batched, subtrees))
+
+    # The peeled nodes were collected top-down, so walking them in reverse combines bottom-up
+    for node in reversed(peeled):
+        left_hash = node.left.merkle_root if node.left else HASH_NONE
+        right_hash = node.right.merkle_root if node.right else HASH_NONE
+        node.merkle_root = H(node._hash_prefix + left_hash + right_hash)
+        node._cached_root = node.merkle_root
+
+    return root.merkle_root
+
+
 def split(t, key, equal_on_the_left=False):
+    """Splits a treap around a key, done with an explicit stack instead of recursion.
+
+    The search path is collected on the way down and the two halves are stitched back together
+    bottom-up, so deep trees neither hit the recursion limit nor pay a Python frame per level.
+    """
+    spine = []
+    while True:
+        if isinstance(t, CompressedNode):
+            raise ErrTouchedCompressedNode("split")
+        if not t:
+            break
+        if t.key < key or (equal_on_the_left and t.key == key):
+            spine.append((t, True))
+            t = t.right
+        else:
+            spine.append((t, False))
+            t = t.left
+
+    L, R = None, None
+    for node, goes_left in reversed(spine):
+        if goes_left:
+            L = Node(
+                key=node.key,  # we set key and prior because element could be None when inserting via proof
+                prior=node.prior,
+                left=node.left,
+                right=L,
+                recursive_merkle=False,
+            )
+        else:
+            R = Node(
+                key=node.key,  # we set key and prior because element could be None when inserting via proof
+                prior=node.prior,
+                left=R,
+                right=node.right,
+                recursive_merkle=False,
+            )
+    return L, R
+
+
+def merge(t1, t2):
+    """Merges two treaps where all keys of t1 precede keys of t2, without recursion.
+
+    The winner of every priority comparison is pushed on a stack while descending the seam
+    between the two trees, and the merged spine is rebuilt from the bottom up.
+    """
+    spine = []
+    while True:
+        if isinstance(t1, CompressedNode) or isinstance(t2, CompressedNode):
+            raise ErrTouchedCompressedNode("merge")
+        if not t1:
+            merged = t2
+            break
+        if not t2:
+            merged = t1
+            break
+        if t1.prior > t2.prior:
+            spine.append((t1, True))
+            t1 = t1.right
+        else:
+            spine.append((t2, False))
+            t2 = t2.left
+
+    for node, from_left in reversed(spine):
+        if from_left:
+            merged = Node(
+                key=node.key,
+                prior=node.prior,  # we set prior for optimization
+                left=node.left,
+                right=merged,
+                recursive_merkle=False,
+            )
+        else:
+            merged = Node(
+                key=node.key,
+                prior=node.prior,  # we set prior for optimization
+                left=merged,
+                right=node.right,
+                recursive_merkle=False,
+            )
+    return merged
+
+
+def _treap_from_sorted(keys):
+    """Builds a treap from a sorted list of keys in linear time.
+
+    Classic Cartesian tree construction: walk the keys left to right keeping the right spine on
+    a stack and pop nodes with smaller priorities to become left children. Merkle roots are
+    filled in with one bottom-up pass at the end because children keep changing during the build.
+    """
+    if not keys:
+        return None
+
+    spine = []
+    nodes = []
+    prev_key = None
+    for key in keys:
+        if key == prev_key:
+            raise ErrKeyInTree(f"key {key.hex()} is already in the tree")
+        prev_key = key
+
+        node = Node(key, recursive_merkle=False)
+        nodes.append(node)
+        last = None
+        while spine and spine[-1].prior < node.prior:
+            last = spine.pop()
+        node.left = last
+        if spine:
+            spine[-1].right = node
+        spine.append(node)
+
+    # The children were linked after construction, so the roots and shape combiners set in
+    # __init__ are stale; rebind them and hash the final structure bottom-up in one pass.
+    for node in nodes:
+        node._cached_root = None
+        node._root_fn = _ROOT_FNS[node.left is None, node.right is None]
+    root = spine[0]
+    compute_merkle_root_batched(root)
+    return root
+
+
+def _split_checked(t, key):
+    """Splits like `split` but additionally reports whether `key` itself is present in t."""
     if isinstance(t, CompressedNode):
         raise ErrTouchedCompressedNode("split")
     if not t:
-        return None, None
+        return None, None, False
 
-    if t.key < key or (equal_on_the_left and t.key == key):
-        L, R = split(t.right, key, equal_on_the_left)
+    if t.key < key:
+        L, R, found = _split_checked(t.right, key)
         new_t = Node(
-            key=t.key,  # we set key and prior because element could be None when inserting via proof
+            key=t.key,
             prior=t.prior,
             left=t.left,
             right=L,
             recursive_merkle=False,
         )
-        return new_t, R
+        return new_t, R, found
     else:
-        L, R = split(t.left, key, equal_on_the_left)
+        L, R, found = _split_checked(t.left, key)
         new_t = Node(
-            key=t.key,  # we set key and prior because element could be None when inserting via proof
+            key=t.key,
             prior=t.prior,
             left=R,
             right=t.right,
             recursive_merkle=False,
         )
-        return L, new_t
+        return L, new_t, found or t.key == key
 
 
-def merge(t1, t2):
-    if isinstance(t1, CompressedNode) or isinstance(t2, CompressedNode):
-        raise ErrTouchedCompressedNode("merge")
-    if not t1:
-        return t2
-    if not t2:
+def _union(t1, t2):
+    """Unions a tree t1 with a treap t2 of freshly built nodes, raising if any key overlaps."""
+    if t2 is None:
         return t1
+    if t1 is None:
+        return t2
+    if isinstance(t1, CompressedNode):
+        raise ErrTouchedCompressedNode("insert")
 
     if t1.prior > t2.prior:
+        L, R, found = _split_checked(t2, t1.key)
+        if found:
+            raise ErrKeyInTree(f"key {t1.key.hex()} is already in the tree")
         return Node(
             key=t1.key,
-            prior=t1.prior,  # we set prior for optimization
-            left=t1.left,
-            right=merge(t1.right, t2),
+            prior=t1.prior,
+            left=_union(t1.left, L),
+            right=_union(t1.right, R),
             recursive_merkle=False,
         )
     else:
+        L, R, found = _split_checked(t1, t2.key)
+        if found:
+            raise ErrKeyInTree(f"key {t2.key.hex()} is already in the tree")
         return Node(
             key=t2.key,
-            prior=t2.prior,  # we set prior for optimization
-            left=merge(t1, t2.left),
-            right=t2.right,
+            prior=t2.prior,
+            left=_union(L, t2.left),
+            right=_union(R, t2.right),
             recursive_merkle=False,
         )
 
 
-def find(t, key):
-    if isinstance(t, CompressedNode):
-        raise ErrTouchedCompressedNode("Searched through compressed nodes.")
-    if t is None:
-        return None
-    if t.key == key:
+def insert_many_bulk(t, keys):
+    """Inserts a sorted batch of keys at once.
+
+    Builds a treap out of the batch in linear time and melds it into the tree, splitting each
+    subtree at most once per batch boundary instead of once per key. The result is the same
+    unique treap that per-key `insert` calls would produce.
+    """
+    if not keys:
+        return t
+    return _union(t, _treap_from_sorted(keys))
+
+
+def remove_many_bulk(t, keys):
+    """Removes a sorted batch of keys in a single descent.
+
+    Partitions the batch around each node's key on the way down and merges the children of the
+    nodes being removed on the way back up. The result is the same unique treap that per-key
+    `remove` calls would produce.
+    """
+    if not keys:
         return t
+    if t is None:
+        raise ErrKeyNotInTree(f"key {keys[0].hex()} not in tree")
+    if isinstance(t, CompressedNode):
+        raise ErrTouchedCompressedNode("remove")
+
+    split_at = bisect_left(keys, t.key)
+    found = split_at < len(keys) and keys[split_at] == t.key
+    left_keys = keys[:split_at]
+    right_keys = keys[split_at + 1 :] if found else keys[split_at:]
+
+    new_left = remove_many_bulk(t.left, left_keys) if left_keys else t.left
+    new_right = remove_many_bulk(t.right, right_keys) if right_keys else t.right
+
+    if found:
+        return merge(new_left, new_right)
+    return Node(
+        key=t.key,
+        prior=t.prior,
+        left=new_left,
+        right=new_right,
+        recursive_merkle=False,
+    )
+
 
-    return find(t.right if key >= t.key else t.left, key)
+def find(t, key):
+    while t is not None:
+        if isinstance(t, CompressedNode):
+            raise ErrTouchedCompressedNode("Searched through compressed nodes.")
+        if t.key == key:
+            return t
+        t = t.right if key >= t.key else t.left
+
+    return None
 
 
 def insert(t, key):
     L, R = split(t, key)
     # Check if the key already exists
     if find(R, key) is not None:
-        raise ErrKeyInTree(f"key {key} is already in the tree")
+        raise ErrKeyInTree(f"key {key.hex()} is already in the tree")
         # Alternatively we could just merge L and R back
         # return merge(L, R)
 
@@ -434,10 +1003,10 @@ def insert(t, key):
     return merge(L, merge(new_node, R))
 
 
-def insert_proof(t, key):
+def insert_proof(t, key, verify=None):
     tree_path = find_path(t, key)
     if tree_path[-1] is not None:
-        raise ErrKeyInTree(f"key {key} in the tree")
+        raise ErrKeyInTree(f"key {key.hex()} in the tree")
 
     # proofs = [
     #     t._compress_tree_for(tree_path[-2].key),
@@ -445,7 +1014,7 @@ def insert_proof(t, key):
     #     t.prove_exclusion(tree_path[-2].key - 1),
     # ]
     # proof = join_proofs(proofs)
-    proof = t.prove_exclusion(tree_path[-2].key + 1)
+    proof = t.prove_exclusion(_adjacent_key(tree_path[-2].key, 1), verify=verify)
     assert t.merkle_root == proof.merkle_root  # sanity check
 
     return proof
@@ -456,7 +1025,7 @@ def remove(t, key):
     if R:
         L2, R2 = split(R, key, equal_on_the_left=True)
         if L2 is None:
-            raise ErrKeyNotInTree(f"key {key} not in tree")
+            raise ErrKeyNotInTree(f"key {key.hex()} not in tree")
         # Note: If L2 is None, it means the element we're removing is not in the tree. We merge L and R2 even
         # when we have nothing to remove.
         return merge(L, R2)
@@ -464,15 +1033,15 @@ def remove(t, key):
     return merge(L, R)
 
 
-def remove_proof(t, key):
+def remove_proof(t, key, verify=None):
     tree_path = find_path(t, key)
     if tree_path[-1] is None:
-        raise ErrKeyNotInTree(f"key {key} not in tree")
+        raise ErrKeyNotInTree(f"key {key.hex()} not in tree")
 
     proofs = [
         # t._compress_tree_for(tree_path[-1].key),
-        t.prove_exclusion(tree_path[-1].key + 1),
-        t.prove_exclusion(tree_path[-1].key - 1),
+        t.prove_exclusion(_adjacent_key(tree_path[-1].key, 1), verify=verify),
+        t.prove_exclusion(_adjacent_key(tree_path[-1].key, -1), verify=verify),
     ]
     proof = join_proofs(proofs)
     assert t.merkle_root == proof.merkle_root  # sanity check
@@ -482,18 +1051,21 @@ def remove_proof(t, key):
 
 def find_path(t, key):
     """Returns the path to the given key."""
-    if t is None:
-        return [None]
-    if t.key == key:
-        return [t]
+    path = []
+    while t is not None:
+        path.append(t)
+        if t.key == key:
+            return path
+        t = t.right if key >= t.key else t.left
 
-    path = find_path(t.right if key >= t.key else t.left, key)
-    return [t] + path
+    # The search fell off the tree; the path ends in None like an unsuccessful recursive descent
+    path.append(None)
+    return path
 
 
 def print_treap(root, indent=""):
     def _short(a):
-        return str(a)[:7]
+        return a.hex()[:7] if isinstance(a, bytes) else str(a)[:7]
     if root is not None:
         if not isinstance(root, CompressedNode):
             print_treap(root.right, indent + "    │")
@@ -505,84 +1077,123 @@ def print_treap(root, indent=""):
 
 
 def join_proofs(proofs):
-    # assert they all have the same merkle root
-    merkle_roots = set([proof.compute_merkle_root() for proof in proofs])
+    # assert they all claim the same merkle root
+    merkle_roots = set(proof.merkle_root for proof in proofs)
     assert len(merkle_roots) == 1
 
+    # Pairwise tournament instead of a linear fold: log k rounds where each round joins trees
+    # of similar size, instead of dragging one ever-growing joined tree through k joins. The
+    # rounds are independent, but worker pools don't pay off here — proofs are linked node
+    # structures that would have to be pickled across processes, and the work is GIL-bound in
+    # threads — so each round runs as a plain loop.
+    while len(proofs) > 1:
+        next_round = [join_two_proofs(a, b) for a, b in zip(proofs[::2], proofs[1::2])]
+        if len(proofs) % 2:
+            next_round.append(proofs[-1])
+        proofs = next_round
     joined = proofs[0]
-    for proof in proofs[1:]:
-        joined = join_two_proofs(joined, proof)
 
-    assert merkle_roots.pop() == joined.merkle_root  # sanity check
+    # The joined tree shares every subtree with its member proofs, so recomputing its root once
+    # verifies all the shared ancestor hashes instead of rehashing each member proof separately.
+    if _VERIFY_PROOFS:
+        assert merkle_roots.pop() == joined.compute_merkle_root()
     return joined
 
 
-def join_two_proofs(a, b):
-    """Joins proofs A and B by creating a relaxed version of both trees."""
-
-    def most_relaxed(a, b):
-        """Returns the most relaxed node type."""
-        # The order in which we prefer nodes because they reveal more data
-        relax_order = {Node: 1, CompressedNode: 2, type(None): 3}
-        order_a = relax_order[type(a)]
-        order_b = relax_order[type(b)]
-        if order_a < order_b:
-            return a
-        return b
+# The order in which we prefer nodes when joining proofs because they reveal more data
+_RELAX_ORDER = {Node: 1, CompressedNode: 2, type(None): 3}
+
 
-    # We only continue recursively if both are Node types
-    if not isinstance(a, Node) and not isinstance(b, Node):
-        # If neither are nodes which continue, return the relaxed one
-        return most_relaxed(a, b)
-    if isinstance(a, Node) and not isinstance(b, Node):
+def _most_relaxed(a, b):
+    """Returns the most relaxed node of the two."""
+    if _RELAX_ORDER[type(a)] < _RELAX_ORDER[type(b)]:
         return a
-    if isinstance(b, Node) and not isinstance(a, Node):
-        return b
-    if isinstance(a, Node) and isinstance(b, Node):
-        # Note: we don't need to recurse for merkle trees because the recursive calls to join_two_proofs will
-        # already correctly compute the merkle roots of the children correctly
-        return Node(
-            key=a.key,
-            prior=a.prior,  # we set prior for optimization
-            left=join_two_proofs(a.left, b.left),
-            right=join_two_proofs(a.right, b.right),
+    return b
+
+
+def join_two_proofs(a, b):
+    """Joins proofs A and B by creating a relaxed version of both trees.
+
+    Only positions where both proofs hold a regular node need to be descended into; everywhere
+    else the more relaxed side wins outright. The matched pairs are collected top-down into a
+    work list and the joined nodes are built in reverse order, so children always exist before
+    their parent and no recursion is needed.
+    """
+    if type(a) is not Node or type(b) is not Node:
+        if type(a) is Node:
+            return a
+        if type(b) is Node:
+            return b
+        return _most_relaxed(a, b)
+
+    # The work list grows while being iterated, so children pairs always come after their
+    # parent pair. Each child resolves either to an index of another pair or to a node.
+    pairs = [(a, b)]
+    children = []
+    for pair_a, pair_b in pairs:
+        spec = []
+        for child_a, child_b in (
+            (pair_a.left, pair_b.left),
+            (pair_a.right, pair_b.right),
+        ):
+            if type(child_a) is Node and type(child_b) is Node:
+                spec.append(len(pairs))
+                pairs.append((child_a, child_b))
+            elif type(child_a) is Node:
+                spec.append(child_a)
+            elif type(child_b) is Node:
+                spec.append(child_b)
+            else:
+                spec.append(_most_relaxed(child_a, child_b))
+        children.append(spec)
+
+    # Note: we don't need to recompute merkle roots recursively because the children are joined
+    # before their parent and already carry correct merkle roots
+    joined = [None] * len(pairs)
+    for i in range(len(pairs) - 1, -1, -1):
+        left, right = children[i]
+        if type(left) is int:
+            left = joined[left]
+        if type(right) is int:
+            right = joined[right]
+        joined[i] = Node(
+            key=pairs[i][0].key,
+            prior=pairs[i][0].prior,  # we set prior for optimization
+            left=left,
+            right=right,
             recursive_merkle=False,
         )
 
-    raise ValueError("Shouldn't reach this")
+    return joined[0]
 
 
 def is_treap(root):
-    def verify_heap(t):
+    # Both invariants are local to a node and its children, so a single explicit-stack walk
+    # checks the heap invariant (a node's priority is above its children's) and the binary
+    # tree invariant (keys grow towards the right) at every node in one pass. Compressed
+    # nodes are opaque and can't be descended into.
+    stack = [root]
+    while stack:
+        t = stack.pop()
         if isinstance(t, CompressedNode):
-            return t.prior
-
-        max_left = verify_heap(t.left) if t.left else -1
-        max_right = verify_heap(t.right) if t.right else -1
-
-        assert t.prior > max_left and t.prior > max_right, "not a heap"
-
-        return t.prior
-
-    def verify_binary_tree(t):
-        if isinstance(t, CompressedNode):
-            return
+            continue
         if t.left:
+            assert t.prior > t.left.prior, "not a heap"
             assert t.key > t.left.key, "not a binary tree"
-            verify_binary_tree(t.left)
+            stack.append(t.left)
         if t.right:
+            assert t.prior > t.right.prior, "not a heap"
             assert t.key < t.right.key, "not a binary tree"
-            verify_binary_tree(t.right)
-
-    verify_heap(root)
-    verify_binary_tree(root)
+            stack.append(t.right)
 
     return True
 
 
 def build_treap(elements):
-    root = None
-    for el in elements:
-        key = to_key(el)
-        root = insert(root, key)
-    return root
+    """Builds a treap for the given elements.
+
+    Since the treap is unique for a set of keys, the keys can be sorted up front and the tree
+    built bottom-up in linear time instead of paying a split/merge (and the O(log n) rebuilt
+    nodes) per element. Duplicates still raise ErrKeyInTree like repeated inserts would.
+    """
+    return _treap_from_sorted(sorted(to_keys(elements)))
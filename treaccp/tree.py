@@ -1,6 +1,6 @@
 """Implementation of a Treaccp which is an interface that connects the elements with the pseudorandom treap."""
 
-from treaccp.nodes import to_key, build_treap
+from treaccp.nodes import to_key, to_keys, build_treap
 from treaccp.acc import Acc
 
 
@@ -67,9 +67,11 @@ class Treaccp:
         return self.insert_many([el], prove=prove)
 
     def insert_many(self, els, prove=True):
-        keys = [to_key(el) for el in els]
+        keys = to_keys(els)
         new_root, proof = self.root.insert_many(keys, prove=prove)
-        new_elements = self.elements | set(els)
+        # update the copy in place instead of building a throwaway set(els) to union with
+        new_elements = set(self.elements)
+        new_elements.update(els)
 
         return Treaccp(new_root, new_elements), proof
 
@@ -77,9 +79,11 @@ class Treaccp:
         return self.remove_many([el], prove=prove)
 
     def remove_many(self, els, prove=True):
-        keys = [to_key(el) for el in els]
+        keys = to_keys(els)
         new_root, proof = self.root.remove_many(keys, prove=prove)
-        new_elements = self.elements - set(els)
+        # update the copy in place instead of building a throwaway set(els) to subtract
+        new_elements = set(self.elements)
+        new_elements.difference_update(els)
 
         return Treaccp(new_root, new_elements), proof
 